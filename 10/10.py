@@ -1,9 +1,9 @@
+from __future__ import annotations
 import itertools
+from array import array
+from collections import deque
 from typing import Tuple
 
-import sys
-sys.setrecursionlimit(100000)
-
 class Pipe:
     def __init__(self, lines: list[str], pos_x: int, pos_y: int):
         self.x = pos_x
@@ -61,26 +61,27 @@ class Pipe:
             if right.symbol in "-J7S" and self.symbol in "-FLS":
                 right.left = self
                 
-    def test_for_cycle(self, pipes2D: list[list], coming_from: Tuple[int, int] = (0, 0), start = None, acc: list = []) -> Tuple[bool, list]:
-        if coming_from == (0, 0):
-            start = self
-        
-        match coming_from:
-            case n if n != (0, 0) and self == start:
-                return (True, acc)
-            case _:
-                if self.up and n != (0, 1):
-                    c, path = self.up.test_for_cycle(pipes2D, (0, -1), start, acc + [self])
-                    if c: return (c, path)
-                if self.down and n != (0, -1):
-                    c, path = self.down.test_for_cycle(pipes2D, (0, 1), start, acc + [self])
-                    if c: return (c, path)
-                if self.right and n != (1, 0):
-                    c, path = self.right.test_for_cycle(pipes2D, (-1, 0), start, acc + [self])
-                    if c: return (c, path)
-                if self.left and n != (-1, 0):
-                    c, path = self.left.test_for_cycle(pipes2D, (1, 0), start, acc + [self])
-                    if c: return (c, path)
+    def next_pipe(self, velocity: Tuple[int, int]) -> Tuple[Pipe | None, Tuple[int, int]]:
+        # Follow the first connection that does not lead back
+        back = (-velocity[0], -velocity[1])
+        for link, v in [(self.up, (0, -1)), (self.down, (0, 1)), (self.right, (1, 0)), (self.left, (-1, 0))]:
+            if link and v != back:
+                return (link, v)
+        return (None, velocity)
+                
+    def test_for_cycle(self) -> Tuple[bool, list[Pipe]]:
+        # Walk from this pipe along each of its connections until back here (or stuck)
+        for first, velocity in [(self.up, (0, -1)), (self.down, (0, 1)), (self.right, (1, 0)), (self.left, (-1, 0))]:
+            path: list[Pipe] = [self]
+            curr = first
+            
+            while curr and curr is not self:
+                path.append(curr)
+                curr, velocity = curr.next_pipe(velocity)
+            
+            if curr is self:
+                return (True, path)
+            
         return (False, [])
 
 class PipeSystem:
@@ -136,7 +137,7 @@ class PipeSystem:
         self.start = start
 
     def find_main_cycle(self) -> Tuple[bool, list[Pipe]]:
-        return self.start.test_for_cycle(self.pipes2D)
+        return self.start.test_for_cycle()
     
     def place_if_empty(self, xss: list[list], relative_to_pipe: Pipe, x: int, y: int) -> None:
         x += relative_to_pipe.x
@@ -150,31 +151,26 @@ class PipeSystem:
         if xss[y][x] == " ":
             xss[y][x] = "I"
             
-    def replicate_marked(self, xss: list[list], symbol: str = "I"):
-        # Replicate 'symbol' in all directions until filled
-        while True:
-            added = 0
-            for y in range(len(xss)):
-                for x in range(len(xss[0])):
-                    if xss[y][x] == symbol:
-                        # up
-                        if y > 0 and xss[y - 1][x] == " ":
-                            xss[y - 1][x] = symbol
-                            added += 1
-                        # down
-                        if y < len(xss) - 1 and xss[y + 1][x] == " ":
-                            xss[y + 1][x] = symbol
-                            added += 1
-                        # left
-                        if x > 0 and xss[y][x - 1] == " ":
-                            xss[y][x - 1] = symbol
-                            added += 1
-                        # right
-                        if x < len(xss[0]) - 1 and xss[y][x + 1] == " ":
-                            xss[y][x + 1] = symbol
-                            added += 1
-            if added == 0:
-                break
+    def replicate_marked(self, xss: list[list], symbol: str = "I", empty: str = " "):
+        # Replicate 'symbol' in all directions until filled (BFS from the existing marks)
+        height, width = len(xss), len(xss[0])
+        visited = bytearray(width * height)
+        queue: deque[Tuple[int, int]] = deque()
+        
+        for y in range(height):
+            for x in range(width):
+                if xss[y][x] == symbol:
+                    visited[y * width + x] = 1
+                    queue.append((x, y))
+        
+        while queue:
+            x, y = queue.popleft()
+            for n_x, n_y in [(x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)]:
+                if 0 <= n_x < width and 0 <= n_y < height \
+                    and not visited[n_y * width + n_x] and xss[n_y][n_x] == empty:
+                        visited[n_y * width + n_x] = 1
+                        xss[n_y][n_x] = symbol
+                        queue.append((n_x, n_y))
             
     def mark_to_the_right(self, xss: list[list], velocity: Tuple[int, int], relative_to_pipe: Pipe):
         # Mark spots to the right from the POV of the pipe
@@ -187,6 +183,22 @@ class PipeSystem:
         if velocity == (-1, 0): # going left
             self.place_if_empty(xss, relative_to_pipe, 0, -1)
     
+    def count_enclosed(self, cycle = None) -> int:
+        # Exact count of tiles inside the loop:
+        #   shoelace formula for the area, then Pick's theorem (A = i + b/2 - 1)
+        if cycle:
+            success, pipes = cycle
+        else:
+            success, pipes = self.find_main_cycle()
+        if not success:
+            raise Exception("Main cycle not found")
+        
+        area2 = 0
+        for p1, p2 in zip(pipes, pipes[1:] + pipes[:1]):
+            area2 += p1.x * p2.y - p2.x * p1.y
+        
+        return (abs(area2) - len(pipes)) // 2 + 1
+    
     # Note: it is not guaranteed that this algorithm 
     #       will find the number of inner or outer spots.
     # 
@@ -269,6 +281,114 @@ class PipeSystem:
                     count += 1
         return (count, cycle2D)
     
+class CompactPipeSystem:
+    # One byte per tile: 4-bit mask of its connections
+    N = 1
+    S = 2
+    E = 4
+    W = 8
+    OPPOSITE = {N: S, S: N, E: W, W: E}
+    
+    SYMBOL_MASKS = {
+        "|": N | S,
+        "-": E | W,
+        "L": N | E,
+        "J": N | W,
+        "7": S | W,
+        "F": S | E,
+    }
+    
+    # Same priority as PipeSystem.determine_start
+    START_MASKS = [N | S, E | W, N | E, N | W, S | E, S | W]
+    
+    # bytes.translate table: symbol -> mask, everything else -> 0
+    TRANSLATION = bytes(map(SYMBOL_MASKS.get, map(chr, range(256)), [0] * 256))
+    
+    masks: bytearray
+    width: int
+    height: int
+    start: int      # flat index y * width + x
+    
+    def __init__(self, lines: list[str]) -> None:
+        self.masks = bytearray()
+        self.start = -1
+        
+        # Parse, skipping blank lines
+        self.width = 0
+        self.height = 0
+        for line in lines:
+            row = line.strip().encode()
+            if not row:
+                continue
+            if self.width == 0:
+                self.width = len(row)
+            elif len(row) != self.width:
+                raise Exception("Ragged rows in pipe map")
+            if (x := row.find(b"S")) != -1:
+                self.start = self.height * self.width + x
+            self.masks += row.translate(self.TRANSLATION)
+            self.height += 1
+        
+        if self.start == -1:
+            raise Exception("Pipe not found")
+        self.determine_start()
+    
+    def step(self, i: int, direction: int) -> int:
+        # Index of the neighbour in 'direction', -1 if outside the grid
+        x = i % self.width
+        if direction == self.N:
+            return i - self.width if i >= self.width else -1
+        if direction == self.S:
+            return i + self.width if i + self.width < len(self.masks) else -1
+        if direction == self.E:
+            return i + 1 if x < self.width - 1 else -1
+        return i - 1 if x > 0 else -1
+    
+    def determine_start(self) -> None:
+        # Connect the start to the neighbours pointing at it
+        connected = 0
+        for direction in [self.N, self.S, self.E, self.W]:
+            n = self.step(self.start, direction)
+            if n != -1 and self.masks[n] & self.OPPOSITE[direction]:
+                connected |= direction
+        
+        for mask in self.START_MASKS:
+            if connected & mask == mask:
+                self.masks[self.start] = mask
+                return
+        raise Exception("Invalid start connections")
+    
+    def find_main_cycle(self) -> array:
+        # Flat indices of the loop, starting at 'start'
+        cycle = array("i", [self.start])
+        mask = self.masks[self.start]
+        direction = mask & -mask    # lowest connection
+        
+        i = self.step(self.start, direction)
+        while i != self.start:
+            if i == -1 or not self.masks[i] & self.OPPOSITE[direction]:
+                raise Exception("Main cycle not found")
+            cycle.append(i)
+            
+            direction = self.masks[i] & ~self.OPPOSITE[direction]
+            i = self.step(i, direction)
+            
+        return cycle
+    
+    def count_enclosed(self, cycle: array | None = None) -> int:
+        # Shoelace formula + Pick's theorem, as in PipeSystem.count_enclosed
+        if cycle is None:
+            cycle = self.find_main_cycle()
+        
+        area2 = 0
+        for i1, i2 in zip(cycle, itertools.chain(cycle[1:], cycle[:1])):
+            y1, x1 = divmod(i1, self.width)
+            y2, x2 = divmod(i2, self.width)
+            area2 += x1 * y2 - x2 * y1
+        
+        return (abs(area2) - len(cycle)) // 2 + 1
+
+    
 def print_map_2D(map2D: list[list[str]]) -> None:
     for row in map2D:
         for c in row:
@@ -277,20 +397,23 @@ def print_map_2D(map2D: list[list[str]]) -> None:
 
 def main() -> None:
     lines = open("input.txt", "r").readlines()
-    pipe_system = PipeSystem(lines)
+    pipe_system = CompactPipeSystem(lines)
     
     # Ex. 1
     print("Ex. 1")
-    success, main_cycle = pipe_system.find_main_cycle()
-    # print(main_cycle)
+    main_cycle = pipe_system.find_main_cycle()
     furthest = int(len(main_cycle) / 2)
     print(furthest)
     
     # Ex. 2
     print("Ex. 2")
-    count, marked_2D = pipe_system.get_inner_marked_2D((success, main_cycle))
-    # print_map_2D(marked_2D)
+    count = pipe_system.count_enclosed(main_cycle)
     print(count)
+    
+    # Visualization
+    # pipe_system_2D = PipeSystem(lines)
+    # _, marked_2D = pipe_system_2D.get_inner_marked_2D()
+    # print_map_2D(marked_2D)
 
 if __name__ == "__main__":
     main()
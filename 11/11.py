@@ -1,4 +1,7 @@
+from __future__ import annotations
 from functools import reduce
+from typing import Iterable, Tuple
+import numpy as np
 
 class Galaxy:
     x: int
@@ -16,63 +19,156 @@ class Galaxy:
         return self.x == __value.x and self.y == __value.y
         
 class GalaxySystem:
-    galaxies: list[Galaxy]
+    # Galaxy coordinates as arrays
+    raw_xs: np.ndarray      # as in the input
+    raw_ys: np.ndarray
+    xs: np.ndarray          # expanded by stretch_mult
+    ys: np.ndarray
+    stretch_mult: int
     
-    def __init__(self, lines: list[str], stretch_mult: int = 2) -> None:
-        self.galaxies = []
-        stretch_mult -= 1   # convert to added amount
+    # Number of empty columns / rows before each coordinate
+    empty_before_x: np.ndarray
+    empty_before_y: np.ndarray
+    
+    # Distance sum is linear in the multiplier: base + (mult - 1) * crossings
+    distance_terms: Tuple[int, int] | None
+    
+    def __init__(self, lines: list[str] | None = None, stretch_mult: int = 2) -> None:
+        self.raw_xs = np.zeros(0, dtype=np.int64)
+        self.raw_ys = np.zeros(0, dtype=np.int64)
+        self.distance_terms = None
+        
+        if not lines:
+            # Empty GalaxySystem object created
+            self.empty_before_x = np.zeros(0, dtype=np.int64)
+            self.empty_before_y = np.zeros(0, dtype=np.int64)
+            self.stretch(stretch_mult)
+            return
         
         # Strip lines
         lines = list(map(lambda x: x.strip(), lines))
         
         # Stretch
-        stretch_list_y = self.get_stretch_coords(lines)
-        stretch_list_x = self.get_stretch_coords(transpose(lines))
+        self.empty_before_y = np.array(self.prefix_counts(self.get_stretch_coords(lines), len(lines)), dtype=np.int64)
+        self.empty_before_x = np.array(self.prefix_counts(self.get_stretch_coords(transpose(lines)), len(lines[0])), dtype=np.int64)
         
         # Parse
-        translated_y = 0
+        xs: list[int] = []
+        ys: list[int] = []
         for y in range(len(lines)):
-            translated_x = 0
             for x in range(len(lines[y])):
-                # Sanity check
-                if (x in stretch_list_x or y in stretch_list_y) and lines[y][x] == "#":
-                    raise Exception(f"Invalid stretch list: error on coordinate ({x}, {y})")
-                
-                # Append galaxy
                 if lines[y][x] == "#":
-                    self.galaxies.append(Galaxy(translated_x, translated_y))
-                # Stretch
-                if x in stretch_list_x:
-                    translated_x += stretch_mult
-                # Increment
-                translated_x += 1
-                
-            # Stretch
-            if y in stretch_list_y:
-                translated_y += stretch_mult
-            # Increment
-            translated_y += 1
+                    xs.append(x)
+                    ys.append(y)
+        self.raw_xs = np.array(xs, dtype=np.int64)
+        self.raw_ys = np.array(ys, dtype=np.int64)
+        
+        self.stretch(stretch_mult)
+    
+    @classmethod
+    def from_file(cls, path: str, stretch_mult: int = 2, use_mmap: bool = False) -> GalaxySystem:
+        # Vectorized loader: the file is viewed as a uint8 matrix, without copies
+        if use_mmap:
+            data = np.memmap(path, dtype=np.uint8, mode="r")
+        else:
+            with open(path, "rb") as f:
+                data = np.frombuffer(f.read(), dtype=np.uint8)
+        
+        # Row terminator taken from the first row ("\n" or "\r\n")
+        first_newline = int(np.argmax(data == ord("\n"))) if len(data) else 0
+        if not len(data) or data[first_newline] != ord("\n"):
+            first_newline = len(data)   # single row without a terminator
+        crlf = first_newline > 0 and data[first_newline - 1] == ord("\r")
+        width = first_newline - 1 if crlf else first_newline
+        stride = first_newline + 1
+        if width == 0:
+            raise Exception("Empty galaxy map")
+        
+        # The last terminator may be missing
+        height = (len(data) + stride - width) // stride
+        terminated = len(data) // stride
+        if len(data) not in (height * stride, (height - 1) * stride + width):
+            raise Exception("Ragged rows in galaxy map")
+        
+        # Every row must have the same width: terminators at the end of each
+        # stride and no other newlines in the file
+        ends = np.lib.stride_tricks.as_strided(data[width:], shape=(terminated, stride - width), strides=(stride, 1))
+        if (ends[:, -1] != ord("\n")).any() or (crlf and (ends[:, 0] != ord("\r")).any()) \
+           or np.count_nonzero(data == ord("\n")) != terminated:
+            raise Exception("Ragged rows in galaxy map")
+        grid = np.lib.stride_tricks.as_strided(data, shape=(height, width), strides=(stride, 1))
+        
+        # Empty rows / columns and their exclusive prefix counts
+        is_galaxy = grid == ord("#")
+        empty_rows = ~is_galaxy.any(axis=1)
+        empty_cols = ~is_galaxy.any(axis=0)
+        
+        res = cls()
+        res.empty_before_y = np.cumsum(empty_rows) - empty_rows
+        res.empty_before_x = np.cumsum(empty_cols) - empty_cols
+        
+        res.raw_ys, res.raw_xs = np.nonzero(is_galaxy)
+        
+        res.stretch(stretch_mult)
+        return res
+    
+    def stretch(self, stretch_mult: int) -> None:
+        added = stretch_mult - 1    # convert to added amount
+        self.stretch_mult = stretch_mult
+        self.xs = self.raw_xs + self.empty_before_x[self.raw_xs] * added
+        self.ys = self.raw_ys + self.empty_before_y[self.raw_ys] * added
+    
+    # Galaxy objects are only built for the debug paths
+    @property
+    def galaxies(self) -> list[Galaxy]:
+        return [Galaxy(x, y) for x, y in zip(self.xs.tolist(), self.ys.tolist())]
+    
+    @property
+    def raw_galaxies(self) -> list[Galaxy]:
+        return [Galaxy(x, y) for x, y in zip(self.raw_xs.tolist(), self.raw_ys.tolist())]
     
     def find_all_distances(self) -> list[int]:
         res: list[int] = []
-        for i in range(len(self.galaxies)):
-            for g2 in self.galaxies[i:]:
-                g1 = self.galaxies[i]
+        galaxies = self.galaxies
+        for i in range(len(galaxies)):
+            for g2 in galaxies[i:]:
+                g1 = galaxies[i]
                 if g1 == g2:
                     continue
                 res.append(self.distance_between(g1, g2))
         return res
     
+    def sum_of_distances(self, stretch_mult: int | None = None) -> int:
+        # Sum of pairwise Manhattan distances, per axis with prefix sums:
+        #   with coordinates sorted, the i-th one is the larger in i pairs
+        if stretch_mult is None:
+            stretch_mult = self.stretch_mult
+        
+        if not self.distance_terms:
+            base = self.sum_of_axis_distances(self.raw_xs) \
+                 + self.sum_of_axis_distances(self.raw_ys)
+            # Empty lines crossed by all pairs
+            crossings = self.sum_of_axis_distances(self.empty_before_x[self.raw_xs]) \
+                      + self.sum_of_axis_distances(self.empty_before_y[self.raw_ys])
+            self.distance_terms = (base, crossings)
+        
+        base, crossings = self.distance_terms
+        return base + (stretch_mult - 1) * crossings
+    
+    def sums_of_distances(self, stretch_mults: Iterable[int]) -> list[int]:
+        return [self.sum_of_distances(m) for m in stretch_mults]
+    
     def print(self) -> None:
         res: list[list[str]] = []
+        galaxies = self.galaxies
         
-        max_x = reduce(lambda acc, galaxy: max(acc, galaxy.x), self.galaxies, 0)
-        max_y = reduce(lambda acc, galaxy: max(acc, galaxy.y), self.galaxies, 0)
+        max_x = reduce(lambda acc, galaxy: max(acc, galaxy.x), galaxies, 0)
+        max_y = reduce(lambda acc, galaxy: max(acc, galaxy.y), galaxies, 0)
         
         for y in range(max_y + 1):
             res.append(["."] * (max_x + 1))
         
-        for galaxy in self.galaxies:
+        for galaxy in galaxies:
             res[galaxy.y][galaxy.x] = "#"
         
         for line in res:
@@ -84,6 +180,25 @@ class GalaxySystem:
     def distance_between(g1: Galaxy, g2: Galaxy) -> int:
         return abs(g1.x - g2.x) + abs(g1.y - g2.y)
     
+    @staticmethod
+    def sum_of_axis_distances(coords: np.ndarray) -> int:
+        # The i-th smallest of n coordinates adds c * (i - (n - 1 - i))
+        c = np.sort(np.asarray(coords, dtype=np.int64))
+        weights = 2 * np.arange(len(c), dtype=np.int64) - (len(c) - 1)
+        return int(np.dot(c, weights))
+    
+    @staticmethod
+    def prefix_counts(coords: list[int], length: int) -> list[int]:
+        # res[i] = number of coords < i
+        res = [0] * length
+        marked = set(coords)
+        count = 0
+        for i in range(length):
+            res[i] = count
+            if i in marked:
+                count += 1
+        return res
+    
     @staticmethod
     def is_empty(row: str) -> bool:
         for c in row:
@@ -106,19 +221,15 @@ def transpose(xss: list[str]) -> list:
     return list(map(lambda x: list(x), zip(*xss)))
 
 def main() -> None:
-    lines = open("input.txt", "r").readlines()
+    galaxy_system = GalaxySystem.from_file("input.txt")
     
     # Ex. 1
     print("Ex. 1")
-    galaxy_system = GalaxySystem(lines)
-    distances = galaxy_system.find_all_distances()
-    print(reduce(lambda acc, x: acc+x, distances, 0))
+    print(galaxy_system.sum_of_distances(2))
     
     # Ex. 2
     print("Ex. 2")
-    galaxy_system = GalaxySystem(lines, stretch_mult=1000000)
-    distances = galaxy_system.find_all_distances()
-    print(reduce(lambda acc, x: acc+x, distances, 0))
+    print(galaxy_system.sum_of_distances(1000000))
 
 if __name__ == "__main__":
     main()
@@ -1,83 +1,193 @@
-from typing import Tuple, Iterable
-from itertools import chain, combinations
+from typing import Tuple
 from functools import reduce
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import hashlib
+import sqlite3
+import time
 
-# Combinations of all possible lengths
-def powerset(iterable: Iterable) -> Iterable:
-    s = list(set(iterable))
-    return chain.from_iterable(combinations(s, r) for r in range(len(s) + 1))
+Problem = Tuple[str, Tuple[int, ...]]
 
-# Get list of indexes where 'symbol' is
-def find_symbol(record: list[str], symbol: str) -> list[int]:
-    res = []
+# Bitmask of indexes where 'symbol' is (bit i is record[i])
+def encode_symbol(record: list[str] | str, symbol: str) -> int:
+    res = 0
     for i in range(len(record)):
         if record[i] == symbol:
-            res.append(i)
+            res |= 1 << i
+    return res
+
+# Lengths of the runs of set bits, lowest bit first
+def run_lengths(mask: int) -> list[int]:
+    res = []
+    while mask:
+        # Skip zeros
+        mask >>= (mask & -mask).bit_length() - 1
+        # Measure the run of ones
+        run = (mask ^ (mask + 1)).bit_length() - 1
+        res.append(run)
+        mask >>= run
     return res
 
-# Count symbol
-def count_symbol(record: list[str], symbol: str) -> int:
-    return reduce(lambda acc, x: acc + 1 if x == symbol else acc, record, 0)
+# pdep-style scatter tables: bit j of a compact value -> j-th set bit of 'mask'.
+#   Three tables: compact bits 0-7, 8-15 and all the rest
+def deposit_tables(mask: int) -> Tuple[list[int], list[int], list[int]]:
+    positions = [i for i in range(mask.bit_length()) if (mask >> i) & 1]
+    tables: list[list[int]] = []
+    for chunk in (positions[:8], positions[8:16], positions[16:]):
+        table = [0] * (1 << len(chunk))
+        for b in range(1, len(table)):
+            # Lowest bit of b, plus the entry without it
+            table[b] = table[b & (b - 1)] | (1 << chunk[(b & -b).bit_length() - 1])
+        tables.append(table)
+    return (tables[0], tables[1], tables[2])
 
-# Produce one possible solution considering some indexes blocked
-def produce_one_possible(record: list[str], groups: list[int], undefined_idx: list[int],
-                         populated_count: int, to_populate: int, blocked_idx: list[int]) -> Tuple[bool, list[int]]:
-    indexes = []
-    for index in undefined_idx:
-        if index not in blocked_idx:
-            indexes.append(index)
-            populated_count += 1
-        if populated_count >= to_populate:
+# Count arrangements matching the groups (dynamic programming)
+def count_arrangements(record: str, groups: Tuple[int, ...]) -> int:
+    # State: group index, length of the run of '#' in progress -> ways,
+    #   rolled forward one record position at a time
+    states: dict[Tuple[int, int], int] = {(0, 0): 1}
+    
+    for c in record:
+        next_states: dict[Tuple[int, int], int] = {}
+        
+        for (g, run), ways in states.items():
+            # Place '#'
+            if c in "#?":
+                if run == 0 and g < len(groups):
+                    next_states[(g, 1)] = next_states.get((g, 1), 0) + ways
+                elif run > 0 and run < groups[g]:
+                    next_states[(g, run + 1)] = next_states.get((g, run + 1), 0) + ways
+            
+            # Place '.'
+            if c in ".?":
+                if run == 0:
+                    next_states[(g, 0)] = next_states.get((g, 0), 0) + ways
+                elif run == groups[g]:
+                    next_states[(g + 1, 0)] = next_states.get((g + 1, 0), 0) + ways
+        
+        states = next_states
+    
+    # All groups closed, or the last one ends with the record
+    res = states.get((len(groups), 0), 0)
+    if groups:
+        res += states.get((len(groups) - 1, groups[-1]), 0)
+    return res
+
+# Repeat the record (joined by '?') and the groups
+def unfold(record: str, groups: Tuple[int, ...], times: int = 5) -> Tuple[str, Tuple[int, ...]]:
+    return ("?".join([record] * times), groups * times)
+
+# Count arrangements by enumerating every fill of the unknown cells (exponential, reference)
+def count_arrangements_brute(record: str, groups_tuple: Tuple[int, ...]) -> int:
+    groups = list(groups_tuple)
+    
+    known = encode_symbol(record, "#")
+    unknown = encode_symbol(record, "?")
+    unknown_count = unknown.bit_count()
+    to_fill = reduce(lambda acc, x: acc + x, groups, 0) - known.bit_count()
+    if to_fill < 0 or to_fill > unknown_count:
+        return 0
+    
+    t0, t1, t2 = deposit_tables(unknown)
+    res = 0
+    
+    # Every combination of exactly 'to_fill' unknown cells (Gosper's hack),
+    #   deposited onto the unknown bits, each one verified once
+    combination = (1 << to_fill) - 1
+    while combination < 1 << unknown_count:
+        cells = known | t0[combination & 0xFF] | t1[(combination >> 8) & 0xFF] | t2[combination >> 16]
+        # Cheap check first: one run start per group
+        if (cells & ~(cells << 1)).bit_count() == len(groups) and run_lengths(cells) == groups:
+            res += 1
+        if combination == 0:
             break
+        lowest = combination & -combination
+        ripple = combination + lowest
+        combination = (((ripple ^ combination) >> 2) // lowest) | ripple
+    
+    return res
 
-    # Verify groups
-    check_groups = []
-    check_curr = 0
-    for i in range(len(record)):
-        if record[i] == "#" or i in indexes:
-            check_curr += 1
-        elif check_curr > 0:
-            check_groups.append(check_curr)
-            check_curr = 0
+# Key of a (record, groups) pair in the on-disk cache
+def problem_key(problem: Problem) -> str:
+    record, groups = problem
+    return hashlib.sha1(f"{record} {','.join(map(str, groups))}".encode()).hexdigest()
+
+def solve_chunk(chunk: list[Problem]) -> list[int]:
+    return [count_arrangements(record, groups) for record, groups in chunk]
+
+# Solve all problems, deduplicated, cached on disk and fanned out to a process pool
+def solve_all(problems: list[Problem], workers: int = 1, cache_path: str | None = None,
+              chunk_size: int = 64, report: bool = False) -> list[int]:
+    t0 = time.perf_counter()
+    unique = list(dict.fromkeys(problems))
+    solved: dict[Problem, int] = {}
+    
+    # Cache lookup
+    db = None
+    if cache_path:
+        db = sqlite3.connect(cache_path)
+        db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, count TEXT)")
+        for problem in unique:
+            row = db.execute("SELECT count FROM results WHERE key = ?", (problem_key(problem),)).fetchone()
+            if row:
+                solved[problem] = int(row[0])
+    hits = len(solved)
+    
+    # Solve the rest
+    todo = [problem for problem in unique if problem not in solved]
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+    
+    if workers <= 1:
+        results = list(map(solve_chunk, chunks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(solve_chunk, chunks))
     
-    # Flush at the end
-    if check_curr > 0:
-        check_groups.append(check_curr)
+    for chunk, counts in zip(chunks, results):
+        for problem, count in zip(chunk, counts):
+            solved[problem] = count
     
-    return (check_groups == groups, indexes)
+    # Cache store
+    if db:
+        with db:
+            db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?)",
+                           [(problem_key(problem), str(solved[problem])) for problem in todo])
+        db.close()
+    
+    if report:
+        elapsed = time.perf_counter() - t0
+        print(f"{len(problems)} lines ({len(unique)} unique) in {elapsed:.3f} s, "
+              f"{len(problems) / elapsed:.0f} lines/s, "
+              f"cache hits {hits}/{len(unique)} ({hits / max(len(unique), 1):.1%})")
+    
+    return [solved[problem] for problem in problems]
 
 def main() -> None:
-    lines = open("input.txt", "r").readlines()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1, help="processes to solve lines with")
+    parser.add_argument("--cache", default=None, help="sqlite file with solved lines")
+    parser.add_argument("--report", action="store_true", help="print throughput and cache hit rate")
+    args = parser.parse_args()
     
-    sum = 0
+    lines = open("input.txt", "r").readlines()
     
+    problems: list[Problem] = []
     for line in lines:
         line = line.strip()
-        record_str, groups_str = line.split()
+        record, groups_str = line.split()
         
         # Parse data
-        groups = list(map(lambda x: int(x), groups_str.split(",")))
-        record = list(record_str)
-        # print(record, groups)
-        
-        # Ex. 1
-        undefined: list[int] = find_symbol(record, "?")
-        populated_count = count_symbol(record, "#")
-        to_populate = reduce(lambda acc, x: acc + x, groups, 0)
+        groups = tuple(map(lambda x: int(x), groups_str.split(",")))
+        problems.append((record, groups))
     
-        blocked_combinations: Iterable[list[int]] = powerset(undefined)
-        successful: list[Tuple[int, ...]] = []
-        
-        for combination in blocked_combinations:
-            success, indexes = produce_one_possible(record, groups, undefined, populated_count, to_populate, combination)
-            # print(combination, success, indexes)
-            if success:
-                successful.append(tuple(indexes))
-        
-        sum += len(set(successful))
+    # Ex. 1
+    print("Ex. 1")
+    print(sum(solve_all(problems, args.workers, args.cache, report=args.report)))
     
-    print(sum)
+    # Ex. 2
+    print("Ex. 2")
+    unfolded = [unfold(record, groups) for record, groups in problems]
+    print(sum(solve_all(unfolded, args.workers, args.cache, report=args.report)))
 
 if __name__ == "__main__":
     main()
-    
\ No newline at end of file
@@ -1,8 +1,11 @@
 from __future__ import annotations
+import argparse
+from abc import ABC, abstractmethod
+from array import array
+from collections import Counter
 from enum import Enum
-from typing import Final, Iterable, TypeVar, Tuple
-
-T = TypeVar('T')
+from typing import Tuple
+import numpy as np
 
 
 class CycleData:
@@ -32,142 +35,55 @@ class Direction(Enum):
     RIGHT = 3
 
 
-class RockSystem:
-    array_2d: list[list[Field]]
+class ARockSystem(ABC):
     cycle_data: CycleData | None
     
-    def __init__(self, lines: list[str] | None = None, array_2d: list[list[Field]] | None = None) -> None:
-        self.cycle_data = None
-        
-        if array_2d:
-            # From 2D array
-            self.array_2d = array_2d
-        else:
-            self.array_2d = []
-            
-            if not lines:
-                # Empty RockSystem object created
-                return
-            
-            # Parse input
-            for line in lines:
-                line = line.strip()
-                self.array_2d.append([])
-                for c in line:
-                    if c == "O":
-                        self.array_2d[-1].append(Field.ROCK)
-                    elif c == "#":
-                        self.array_2d[-1].append(Field.BARRIER)
-                    else:
-                        self.array_2d[-1].append(Field.EMPTY)
-    
-    def get_tilted(self, direction: Direction) -> RockSystem:
-        is_transposed: Final[bool] = direction in [Direction.UP, Direction.DOWN]
-        is_reversed: Final[bool] = direction in [Direction.UP, Direction.LEFT]
-        
-        a2d: Final[list[list[Field]]] = transpose(self.array_2d) if is_transposed else self.array_2d
-        
-        # For each row collect a list of groups.
-        # Each group counts the number of rocks
-        #   and ends at a barrier, or at end of line.
-        groups: list[list[int]] = []
-        row_range: Iterable
-        
-        for row in a2d:
-            buffer: int = 0
-            groups.append([])
-            
-            if is_reversed:
-                row_range = reversed(range(len(row)))
-            else:
-                row_range = range(len(row))
-            
-            for i in row_range:
-                if row[i] == Field.ROCK:
-                    buffer += 1
-                
-                if is_reversed:
-                    at_end = i == 0
-                else:
-                    at_end = i == len(row) - 1
-                
-                if row[i] == Field.BARRIER or at_end:
-                    groups[-1].append(buffer)
-                    buffer = 0
-        
-        # Build the resulting 2D array
-        WIDTH = len(a2d[0])
-        HEIGHT = len(a2d)
-        
-        res: list[list[Field]] = [[Field.EMPTY for _ in range(WIDTH)] for _ in range(HEIGHT)]
-        
-        for y in range(HEIGHT):
-            row_groups = groups.pop(0)
-            hit = 0
-            approaching = False
-            
-            if is_reversed:
-                row_range = reversed(range(WIDTH))
-            else:
-                row_range = range(WIDTH)
-            
-            for x in row_range:
-                # Determine if we are approaching the barrier / EOL
-                if is_reversed:
-                    if x - row_groups[hit] < 0 or a2d[y][x - row_groups[hit]] == Field.BARRIER:
-                        approaching = True
-                else:
-                    if x + row_groups[hit] >= WIDTH or a2d[y][x + row_groups[hit]] == Field.BARRIER:
-                        approaching = True
-                    
-                # Copy barriers, rest is empty
-                if a2d[y][x] == Field.BARRIER:
-                    res[y][x] = Field.BARRIER
-                    # Reset
-                    approaching = False
-                    # Next group
-                    hit += 1
-                elif approaching:
-                    # Place rocks if approaching
-                    res[y][x] = Field.ROCK
-                    
-        return RockSystem(array_2d=(transpose(res) if is_transposed else res))
-
-    def get_load(self) -> int:
-        sum = 0
-        HEIGHT = len(self.array_2d)
-        
-        for i in range(HEIGHT):
-            for el in self.array_2d[i]:
-                if el == Field.ROCK:
-                    sum += HEIGHT - i
-        
-        return sum
+    @property
+    @abstractmethod
+    def array_2d(self) -> list[list[Field]]: pass
+    
+    @abstractmethod
+    def tilt(self, direction: Direction) -> ARockSystem: pass
+    
+    @abstractmethod
+    def copy(self) -> ARockSystem: pass
+    
+    @abstractmethod
+    def get_load(self) -> int: pass
     
-    # Set window and cycles higher to avoid wrong results caused by collisions
-    def find_period(self, cycles: int, window: int) -> CycleData:
+    @abstractmethod
+    def state_key(self) -> bytes: pass
+    
+    def spin(self) -> ARockSystem:
+        return self.tilt(Direction.UP)    \
+                   .tilt(Direction.LEFT)  \
+                   .tilt(Direction.DOWN)  \
+                   .tilt(Direction.RIGHT)
+    
+    def get_tilted(self, direction: Direction) -> ARockSystem:
+        return self.copy().tilt(direction)
+    
+    # Spins until a state repeats (exact), 'cycles' is the upper bound
+    def find_period(self, cycles: int) -> CycleData:
         if self.cycle_data:         # calculate this only once
             return self.cycle_data
         
-        curr = self
-        previous: list[int] = []
-        
-        for _ in range(cycles):
-            curr = curr.get_tilted(Direction.UP)    \
-                    .get_tilted(Direction.LEFT)  \
-                    .get_tilted(Direction.DOWN)  \
-                    .get_tilted(Direction.RIGHT)
-                    
-            load = curr.get_load()
-            previous.append(load)
+        curr = self.copy()
+        first_seen: dict[bytes, int] = {}
+        values: list[int] = []
+        
+        for i in range(cycles):
+            curr.spin()
+            
+            key = curr.state_key()
+            if key in first_seen:
+                start = first_seen[key]
+                self.cycle_data = CycleData(start_offset=start, period=i - start, values=values)
+                return self.cycle_data
             
-            for i in range(len(previous) - window):
-                for offset in range(i + window, len(previous) - window):
-                    if previous[i:(i + window)] == previous[(i + offset):(i + window + offset)]:
-                        cycle_data = CycleData(start_offset=i, period=offset, values=previous)
-                        
-                        self.cycle_data = cycle_data
-                        return cycle_data
+            # values[i] is the load after i + 1 cycles
+            first_seen[key] = i
+            values.append(curr.get_load())
         
         raise Exception("Period not found")
 
@@ -175,11 +91,12 @@ class RockSystem:
         if not self.cycle_data:
             raise Exception("Call find_period() first")
         
-        if cycles <= self.cycle_data.start_offset + self.cycle_data.period:
-            return self.cycle_data.values[cycles - 1]
+        start, period = self.cycle_data.start_offset, self.cycle_data.period
+        i = cycles - 1
         
-        repeating_values = self.cycle_data.values[:-self.cycle_data.period]
-        return repeating_values[cycles % self.cycle_data.period - 1]
+        if i < start + period:
+            return self.cycle_data.values[i]
+        return self.cycle_data.values[start + (i - start) % period]
 
     @staticmethod
     def str_of_array_2d(a2d: list[list[Field]]) -> str:
@@ -199,13 +116,204 @@ class RockSystem:
         return self.str_of_array_2d(self.array_2d)
 
 
-def transpose(a2d: list[list[T]]) -> list[list[T]]:
-    return list(map(lambda x: list(x), zip(*a2d)))
+class RockSystem(ARockSystem):
+    grid: np.ndarray    # uint8, values of Field
+    
+    # Per direction: (cell order, segment id, rank in segment, segment count).
+    # Cells are ordered line by line starting from the wall the rocks roll to,
+    #   each segment is a run of non-barrier cells between barriers / edges.
+    segments: dict[Direction, Tuple[np.ndarray, np.ndarray, np.ndarray, int]]
+    
+    def __init__(self, lines: list[str] | None = None, array_2d: list[list[Field]] | None = None) -> None:
+        self.cycle_data = None
+        self.segments = {}
+        
+        if array_2d:
+            # From 2D array
+            self.grid = np.array([[f.value for f in row] for row in array_2d], dtype=np.uint8)
+        else:
+            if not lines:
+                # Empty RockSystem object created
+                self.grid = np.zeros((0, 0), dtype=np.uint8)
+                return
+            
+            # Parse input
+            lookup = np.full(256, Field.EMPTY.value, dtype=np.uint8)
+            lookup[ord("O")] = Field.ROCK.value
+            lookup[ord("#")] = Field.BARRIER.value
+            
+            rows = [line.strip().encode() for line in lines if line.strip()]
+            self.grid = lookup[np.frombuffer(b"".join(rows), dtype=np.uint8)].reshape(len(rows), -1)
+            
+        self.build_segments()
+    
+    @property
+    def array_2d(self) -> list[list[Field]]:
+        return [[Field(v) for v in row] for row in self.grid.tolist()]
+    
+    def build_segments(self) -> None:
+        # Barriers never move, so this is done once per grid
+        HEIGHT, WIDTH = self.grid.shape
+        flat_idx = np.arange(HEIGHT * WIDTH).reshape(HEIGHT, WIDTH)
+        
+        lines_of = {
+            Direction.LEFT: flat_idx,
+            Direction.RIGHT: flat_idx[:, ::-1],
+            Direction.UP: flat_idx.T,
+            Direction.DOWN: flat_idx.T[:, ::-1],
+        }
+        
+        for direction, idx_2d in lines_of.items():
+            order = idx_2d.ravel()
+            is_barrier = self.grid.ravel()[order] == Field.BARRIER.value
+            
+            # A segment starts at a line start or right after a barrier
+            starts = np.zeros(len(order), dtype=bool)
+            starts[::idx_2d.shape[1]] = True
+            starts[1:] |= is_barrier[:-1]
+            
+            pos = np.arange(len(order))
+            seg_id = np.cumsum(starts) - 1
+            rank = pos - np.maximum.accumulate(np.where(starts, pos, 0))
+            
+            keep = ~is_barrier
+            self.segments[direction] = (order[keep], seg_id[keep], rank[keep], int(seg_id[-1]) + 1 if len(order) else 0)
+    
+    def tilt(self, direction: Direction) -> RockSystem:
+        # Tilt in place: each segment keeps its rock count, stacked against the wall
+        order, seg_id, rank, seg_count = self.segments[direction]
+        flat = self.grid.reshape(-1)
+        
+        is_rock = flat[order] == Field.ROCK.value
+        counts = np.bincount(seg_id[is_rock], minlength=seg_count)
+        flat[order] = np.where(rank < counts[seg_id], Field.ROCK.value, Field.EMPTY.value)
+        
+        return self
+    
+    def copy(self) -> RockSystem:
+        res = RockSystem()
+        res.grid = self.grid.copy()
+        res.segments = self.segments    # read-only, shared
+        return res
+    
+    def get_load(self) -> int:
+        HEIGHT = self.grid.shape[0]
+        rocks_per_row = np.count_nonzero(self.grid == Field.ROCK.value, axis=1)
+        return int(rocks_per_row @ np.arange(HEIGHT, 0, -1))
+    
+    def state_key(self) -> bytes:
+        # Barriers never move, so the rock positions identify the state
+        return np.packbits(self.grid == Field.ROCK.value).tobytes()
+
+
+class SparseRockSystem(ARockSystem):
+    # Stores only the movable rocks (flat indices y * width + x),
+    #   tilting costs O(rocks) instead of O(cells).
+    width: int
+    height: int
+    barriers: set[int]
+    rocks: list[int]
+    
+    # Per direction: for every cell, the cell at the wall end of its segment
+    #   (next to the nearest barrier / edge the rocks roll to), and the step
+    #   that stacks the following rocks away from that wall.
+    stops: dict[Direction, Tuple[array, int]]
+    
+    def __init__(self, lines: list[str] | None = None) -> None:
+        self.cycle_data = None
+        self.barriers = set()
+        self.rocks = []
+        self.stops = {}
+        self.width = 0
+        self.height = 0
+        
+        if not lines:
+            # Empty SparseRockSystem object created
+            return
+        
+        # Parse input
+        rows = [line.strip() for line in lines if line.strip()]
+        self.width = len(rows[0])
+        self.height = len(rows)
+        
+        for y, row in enumerate(rows):
+            for x, c in enumerate(row):
+                if c == "O":
+                    self.rocks.append(y * self.width + x)
+                elif c == "#":
+                    self.barriers.add(y * self.width + x)
+        
+        self.build_stops()
+    
+    @property
+    def array_2d(self) -> list[list[Field]]:
+        res = [[Field.EMPTY for _ in range(self.width)] for _ in range(self.height)]
+        for i in self.barriers:
+            res[i // self.width][i % self.width] = Field.BARRIER
+        for i in self.rocks:
+            res[i // self.width][i % self.width] = Field.ROCK
+        return res
+    
+    def build_stops(self) -> None:
+        # Barriers never move, so this is done once per grid
+        W, H = self.width, self.height
+        
+        lines_of = {
+            Direction.UP: ([[y * W + x for y in range(H)] for x in range(W)], W),
+            Direction.DOWN: ([[y * W + x for y in reversed(range(H))] for x in range(W)], -W),
+            Direction.LEFT: ([[y * W + x for x in range(W)] for y in range(H)], 1),
+            Direction.RIGHT: ([[y * W + x for x in reversed(range(W))] for y in range(H)], -1),
+        }
+        
+        for direction, (lines, step) in lines_of.items():
+            stop = array("i", [0]) * (W * H)
+            for line in lines:
+                wall = line[0]
+                for prev, i in zip([-1] + line, line):
+                    if prev in self.barriers:
+                        wall = i
+                    stop[i] = wall
+            self.stops[direction] = (stop, step)
+    
+    def tilt(self, direction: Direction) -> SparseRockSystem:
+        stop, step = self.stops[direction]
+        
+        # Rocks sharing a wall stack up against it
+        rocks: list[int] = []
+        for wall, count in Counter(stop[i] for i in self.rocks).items():
+            rocks.extend(range(wall, wall + step * count, step))
+        self.rocks = rocks
+        
+        return self
+    
+    def copy(self) -> SparseRockSystem:
+        res = SparseRockSystem()
+        res.width, res.height = self.width, self.height
+        res.rocks = self.rocks.copy()
+        res.barriers = self.barriers    # read-only, shared
+        res.stops = self.stops          # read-only, shared
+        return res
+    
+    def get_load(self) -> int:
+        return sum(self.height - i // self.width for i in self.rocks)
+    
+    def state_key(self) -> bytes:
+        return array("i", sorted(self.rocks)).tobytes()
+
+
+BACKENDS: dict[str, type[ARockSystem]] = {
+    "dense": RockSystem,
+    "sparse": SparseRockSystem,
+}
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=BACKENDS.keys(), default="dense")
+    args = parser.parse_args()
+    
     lines = open("input.txt", "r").readlines()
-    rock_system = RockSystem(lines)
+    rock_system = BACKENDS[args.backend](lines)
     
     # Ex. 1
     print("Ex. 1")
@@ -214,7 +322,7 @@ def main() -> None:
     
     # Ex. 2
     print("Ex. 2")
-    rock_system.find_period(cycles=10000, window=500)
+    rock_system.find_period(cycles=10000)
     
     CYCLES = 1000000000
     print(rock_system.get_load_in_cycles(CYCLES))
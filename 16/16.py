@@ -1,5 +1,10 @@
 from __future__ import annotations
+import argparse
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
+from multiprocessing import shared_memory
 from typing_extensions import Self
 
 
@@ -11,6 +16,8 @@ class Direction(Enum):
 
 
 class Beam:
+    __slots__ = ("direction", "x", "y")
+    
     direction: Direction
     x: int
     y: int
@@ -20,6 +27,9 @@ class Beam:
         self.x = x
         self.y = y
 
+    def __repr__(self) -> str:
+        return f"<{self.direction.name}: ({self.x}, {self.y})>"
+
     def move(self) -> None:
         match self.direction:
             case Direction.UP:
@@ -34,14 +44,17 @@ class Beam:
 
 class LightSystem:
     char_map: list[list[str]]
-    energized_map: list[list[int]]
-    split_map: list[list[bool]]
     
-    beams: list[Beam]
+    # Per cell, one visited bit per direction (1 << Direction.value)
+    visited: bytearray
+    # Packed beam states: (y * width + x) * 4 + direction
+    beams: deque[int]
     
     width: int
     height: int
     
+    out_table: dict[tuple[str, int], tuple[int, ...]]
+    
     # / 
     R_MIRROR_MAP = {
         Direction.RIGHT: Direction.UP,
@@ -65,9 +78,11 @@ class LightSystem:
         Direction.DOWN: "v"
     }
     
+    DX = (0, 0, -1, 1)
+    DY = (-1, 1, 0, 0)
+    
     def __init__(self, lines: list[str], start_beam: Beam = Beam()) -> None:
         self.char_map = []
-        self.beams = []
         
         # Parse
         for line in lines:
@@ -78,127 +93,335 @@ class LightSystem:
                 
         self.width = len(self.char_map[0])
         self.height = len(self.char_map)
-                
-        # Place the starting beam
-        self.beams.append(start_beam)
+        
+        # Outgoing directions for every (tile, incoming direction)
+        self.out_table = {}
+        for tile in "./\\-|":
+            for direction in Direction:
+                self.out_table[(tile, direction.value)] = tuple(
+                    d.value for d in self.out_directions(tile, direction)
+                )
         
         # Init maps
-        self.energized_map = [[0 for _ in range(self.width)] for _ in range(self.height)]
-        self.split_map = [[False for _ in range(self.width)] for _ in range(self.height)]
+        self.visited = bytearray(self.width * self.height)
+                
+        # Place the starting beam
+        self.beams = deque([(start_beam.y * self.width + start_beam.x) * 4 + start_beam.direction.value])
+    
+    @classmethod
+    def out_directions(cls, tile: str, direction: Direction) -> list[Direction]:
+        if tile == "/":
+            return [cls.R_MIRROR_MAP[direction]]
+        if tile == "\\":
+            return [cls.L_MIRROR_MAP[direction]]
+        if tile == "-" and direction in [Direction.UP, Direction.DOWN]:
+            return [Direction.LEFT, Direction.RIGHT]
+        if tile == "|" and direction in [Direction.LEFT, Direction.RIGHT]:
+            return [Direction.UP, Direction.DOWN]
+        return [direction]
         
     def step(self) -> Self:
-        for beam in self.beams:
-            # Check if out of bounds
-            if beam.x >= self.width or beam.x < 0 \
-                or beam.y >= self.height or beam.y < 0:
-                    self.beams.remove(beam)
-                    continue
+        # Advance every beam present at the start of the tick by one tile
+        for _ in range(len(self.beams)):
+            cell, d = divmod(self.beams.popleft(), 4)
             
-            # Tick energized
-            self.energized_map[beam.y][beam.x] = 1
+            # Drop beams retracing an already travelled path
+            if self.visited[cell] & (1 << d):
+                continue
+            self.visited[cell] |= 1 << d
             
-            # Get tile
-            tile = self.char_map[beam.y][beam.x]
-        
-            # Process mirrors
-            if tile == "/":
-                beam.direction = self.R_MIRROR_MAP[beam.direction]
-            if tile == "\\":
-                beam.direction = self.L_MIRROR_MAP[beam.direction]
-                
-            # Process splitters
-            if tile == "-" and beam.direction in [Direction.UP, Direction.DOWN]:
-                if not self.split_map[beam.y][beam.x]:
-                    beam.direction = Direction.LEFT
-                    self.beams.append(Beam(direction=Direction.RIGHT, x=beam.x, y=beam.y))
-                    self.split_map[beam.y][beam.x] = True
-                else:
-                    self.beams.remove(beam)
+            y, x = divmod(cell, self.width)
             
-            if tile == "|" and beam.direction in [Direction.LEFT, Direction.RIGHT]:
-                if not self.split_map[beam.y][beam.x]:
-                    beam.direction = Direction.UP
-                    self.beams.append(Beam(direction=Direction.DOWN, x=beam.x, y=beam.y))
-                    self.split_map[beam.y][beam.x] = True
-                else:
-                    self.beams.remove(beam)
-                
-            # Move
-            beam.move()
+            # Mirrors and splitters
+            for out in self.out_table[(self.char_map[y][x], d)]:
+                # Move, dropping beams that leave the grid
+                nx, ny = x + self.DX[out], y + self.DY[out]
+                if 0 <= nx < self.width and 0 <= ny < self.height:
+                    self.beams.append((ny * self.width + nx) * 4 + out)
             
         return self
+    
+    def run(self) -> Self:
+        # Step until every beam has left the grid or looped back (fixed point)
+        while self.beams:
+            self.step()
+        return self
                 
     def print(self) -> Self:
+        beam_chars: dict[int, str] = {}
+        for state in self.beams:
+            cell, d = divmod(state, 4)
+            beam_chars.setdefault(cell, self.DIR_TO_CHAR_MAP[Direction(d)])
+        
         for y, row in enumerate(self.char_map):
             for x, tile in enumerate(row):
-                for beam in self.beams:
-                    if beam.x == x and beam.y == y:
-                        print(self.DIR_TO_CHAR_MAP[beam.direction], end="")
-                        break
-                else:
-                    print(tile, end="")
+                print(beam_chars.get(y * self.width + x, tile), end="")
             print()
         print()
         return self
     
     def print_energized(self) -> Self:
-        for row in self.energized_map:
-            for tile in row:
+        for y in range(self.height):
+            for tile in self.visited[y * self.width:(y + 1) * self.width]:
                 print("#" if tile else ".", end="")
             print()
         print()
         return self
     
     def count_energized(self) -> int:
-        count = 0
-        for row in self.energized_map:
-            for tile in row:
-                if tile:
-                    count += 1
-        return count
+        # A cell is energized if it was visited in any direction
+        return len(self.visited) - self.visited.count(0)
 
 
-def main() -> None:
-    lines = open("input.txt", "r").readlines()
-    TRIES = 1000
+class BeamGraph:
+    # Every beam state (cell, direction) is a node of a graph.
+    # A node owns the straight segment the beam travels after leaving its cell,
+    #   up to (not including) the next mirror / splitter, which is the next node.
+    # Energized sets are cached per strongly connected component,
+    #   so sweeping many entry beams reuses the shared work.
+    char_map: list[str]
     
-    # Ex. 1
-    light_system = LightSystem(lines)
-    for _ in range(TRIES):
-        light_system.step()
+    width: int
+    height: int
     
-    # light_system.print_energized()
-    print(light_system.count_energized())
+    # Per unresolved node: straight runs (first cell, direction, length), successor states.
+    #   Dropped once the node's component is complete.
+    segments: dict[int, tuple[list[tuple[int, int, int]], list[int]]]
+    scc_of: dict[int, int]
+    scc_masks: list[int]
     
-    # Ex. 2
-    width = light_system.width
-    height = light_system.height
-    max_energized = 0
+    # One bit per row in a single column, to build vertical run masks
+    column_mask: int
     
-    def try_ls(ls: LightSystem):
-        nonlocal max_energized
-        for _ in range(TRIES):
-            ls.step()
-        if (x := ls.count_energized()) > max_energized:
-            max_energized = x
+    def __init__(self, lines: list[str]) -> None:
+        # Parse
+        self.char_map = [line.strip() for line in lines if line.strip()]
+        
+        self.width = len(self.char_map[0])
+        self.height = len(self.char_map)
+        
+        self.column_mask = 0
+        for y in range(self.height):
+            self.column_mask |= 1 << (y * self.width)
+        
+        # Caches
+        self.segments = {}
+        self.scc_of = {}
+        self.scc_masks = []
     
-    for y in range(height):
-        light_system = LightSystem(lines, Beam(Direction.RIGHT, 0, y))
-        try_ls(light_system)
+    def state_of(self, beam: Beam) -> int:
+        return (beam.y * self.width + beam.x) * 4 + beam.direction.value
+    
+    def segment(self, state: int) -> tuple[list[tuple[int, int, int]], list[int]]:
+        # Returns: runs of empty cells lit by this node, successor states
+        if state in self.segments:
+            return self.segments[state]
+        
+        cell, d = divmod(state, 4)
+        y, x = divmod(cell, self.width)
+        
+        runs: list[tuple[int, int, int]] = []
+        successors: list[int] = []
+        
+        for direction in LightSystem.out_directions(self.char_map[y][x], Direction(d)):
+            dx, dy = LightSystem.DX[direction.value], LightSystem.DY[direction.value]
+            nx, ny = x + dx, y + dy
             
-        light_system = LightSystem(lines, Beam(Direction.LEFT, width - 1, y))
-        try_ls(light_system)
+            # Walk over empty tiles
+            length = 0
+            while 0 <= nx < self.width and 0 <= ny < self.height and self.char_map[ny][nx] == ".":
+                length += 1
+                nx += dx
+                ny += dy
+            if length:
+                runs.append(((y + dy) * self.width + x + dx, direction.value, length))
+            
+            # Stopped at a mirror / splitter
+            if 0 <= nx < self.width and 0 <= ny < self.height:
+                successors.append((ny * self.width + nx) * 4 + direction.value)
+        
+        self.segments[state] = (runs, successors)
+        return self.segments[state]
     
-    for x in range(width):
-        light_system = LightSystem(lines, Beam(Direction.DOWN, x, 0))
-        try_ls(light_system)
+    def run_mask(self, first: int, direction: int, length: int) -> int:
+        # Bitmask of 'length' cells starting at 'first' and walking in 'direction'
+        match Direction(direction):
+            case Direction.RIGHT:
+                return ((1 << length) - 1) << first
+            case Direction.LEFT:
+                return ((1 << length) - 1) << (first - length + 1)
+            case Direction.DOWN:
+                return (self.column_mask & ((1 << (length * self.width)) - 1)) << first
+            case Direction.UP:
+                return (self.column_mask & ((1 << (length * self.width)) - 1)) << (first - (length - 1) * self.width)
+    
+    def resolve(self, root: int) -> int:
+        # Iterative Tarjan's algorithm, returns the component id of 'root'.
+        # Components are completed successors-first, so each one can
+        #   merge the (already final) masks of the components it leads to.
+        if root in self.scc_of:
+            return self.scc_of[root]
         
-        light_system = LightSystem(lines, Beam(Direction.UP, x, height - 1))
-        try_ls(light_system)
+        index: dict[int, int] = {root: 0}
+        lowlink: dict[int, int] = {root: 0}
+        stack: list[int] = [root]
+        on_stack: set[int] = {root}
+        work = [(root, iter(self.segment(root)[1]))]
         
+        while work:
+            v, successors = work[-1]
+            
+            for w in successors:
+                if w in self.scc_of:
+                    continue    # finished component
+                if w not in index:
+                    index[w] = lowlink[w] = len(index)
+                    stack.append(w)
+                    on_stack.add(w)
+                    work.append((w, iter(self.segment(w)[1])))
+                    break
+                if w in on_stack:
+                    lowlink[v] = min(lowlink[v], index[w])
+            else:
+                work.pop()
+                if work:
+                    u = work[-1][0]
+                    lowlink[u] = min(lowlink[u], lowlink[v])
+                
+                if lowlink[v] != index[v]:
+                    continue
+                
+                # Pop the component
+                scc_id = len(self.scc_masks)
+                members: list[int] = []
+                while True:
+                    w = stack.pop()
+                    on_stack.discard(w)
+                    self.scc_of[w] = scc_id
+                    members.append(w)
+                    if w == v:
+                        break
+                
+                # Full mask only per component, the members' segments are no longer needed
+                mask = 0
+                for w in members:
+                    runs, member_successors = self.segments.pop(w)
+                    mask |= 1 << (w // 4)
+                    for run in runs:
+                        mask |= self.run_mask(*run)
+                    for s in member_successors:
+                        if self.scc_of[s] != scc_id:
+                            mask |= self.scc_masks[self.scc_of[s]]
+                self.scc_masks.append(mask)
+        
+        return self.scc_of[root]
+    
+    def energized_mask(self, beam: Beam) -> int:
+        return self.scc_masks[self.resolve(self.state_of(beam))]
+    
+    def count_energized(self, beam: Beam) -> int:
+        return self.energized_mask(beam).bit_count()
+
+
+def edge_beams(width: int, height: int) -> list[Beam]:
+    # All beams entering the grid from its edges
+    beams: list[Beam] = []
+    for y in range(height):
+        beams.append(Beam(Direction.RIGHT, 0, y))
+        beams.append(Beam(Direction.LEFT, width - 1, y))
+    for x in range(width):
+        beams.append(Beam(Direction.DOWN, x, 0))
+        beams.append(Beam(Direction.UP, x, height - 1))
+    return beams
+
+
+# Per-process state of the parallel sweep workers
+_worker_graph: BeamGraph | None = None
+_worker_beams: list[Beam] = []
+
+
+def _init_worker(shm_name: str, size: int) -> None:
+    # Attach to the shared grid buffer and build a private (memoized) graph
+    global _worker_graph, _worker_beams
+    shm = shared_memory.SharedMemory(name=shm_name)
+    lines = bytes(shm.buf[:size]).decode().split("\n")
+    shm.close()
+    
+    _worker_graph = BeamGraph(lines)
+    _worker_beams = edge_beams(_worker_graph.width, _worker_graph.height)
+
+
+def _sweep_shard(shard: int, start: int, end: int) -> tuple[int, int, int, float]:
+    # Returns: shard, max energized, index of the winning beam, elapsed seconds
+    if _worker_graph is None:
+        raise Exception("Worker not initialized")
+    
+    t0 = time.perf_counter()
+    best, best_idx = -1, -1
+    for i in range(start, end):
+        if (x := _worker_graph.count_energized(_worker_beams[i])) > best:
+            best, best_idx = x, i
+    return (shard, best, best_idx, time.perf_counter() - t0)
+
+
+def sweep_edges(lines: list[str], workers: int = 1, report: bool = False) -> tuple[int, Beam]:
+    # Returns: max energized, winning entry beam.
+    # Ties go to the first beam in edge_beams() order, for any worker count.
+    beam_graph = BeamGraph(lines)
+    beams = edge_beams(beam_graph.width, beam_graph.height)
+    
+    if workers <= 1:
+        best, best_idx = -1, -1
+        for i, beam in enumerate(beams):
+            if (x := beam_graph.count_energized(beam)) > best:
+                best, best_idx = x, i
+        return (best, beams[best_idx])
+    
+    # Parse once into a shared read-only buffer
+    data = "\n".join(beam_graph.char_map).encode()
+    shm = shared_memory.SharedMemory(create=True, size=len(data))
+    shm.buf[:len(data)] = data
+    
+    # Contiguous shards, a few per worker to balance the load
+    shard_count = min(len(beams), workers * 4)
+    bounds = [len(beams) * k // shard_count for k in range(shard_count + 1)]
+    
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shm.name, len(data))) as executor:
+            results = list(executor.map(_sweep_shard, range(shard_count), bounds[:-1], bounds[1:]))
+    finally:
+        shm.close()
+        shm.unlink()
+    
+    if report:
+        for shard, best, best_idx, elapsed in results:
+            print(f"shard {shard}: beams {bounds[shard]}-{bounds[shard + 1] - 1}, "
+                  f"max {best} ({beams[best_idx]}), {elapsed * 1000:.2f} ms")
+    
+    # Deterministic reduction: highest count, then lowest beam index
+    _, best, best_idx, _ = max(results, key=lambda r: (r[1], -r[2]))
+    return (best, beams[best_idx])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1, help="processes for the edge sweep")
+    parser.add_argument("--report", action="store_true", help="print per-shard timings")
+    args = parser.parse_args()
+    
+    lines = open("input.txt", "r").readlines()
+    
+    # Ex. 1
+    light_system = LightSystem(lines).run()
+    
+    # light_system.print_energized()
+    print(light_system.count_energized())
+    
+    # Ex. 2
+    max_energized, _ = sweep_edges(lines, workers=args.workers, report=args.report)
     print(max_energized)
         
 
 if __name__ == "__main__":
     main()
-    
\ No newline at end of file
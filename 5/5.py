@@ -1,6 +1,16 @@
+from __future__ import annotations
+import argparse
 from abc import ABC, abstractmethod
+from bisect import bisect_right
+from functools import reduce
 from typing import TypedDict
-from intervaltree import Interval, IntervalTree # type: ignore
+import math
+
+# Only needed by the Mapping classes (--interval-tree), the compiled path does not use it
+try:
+    from intervaltree import Interval, IntervalTree # type: ignore
+except ImportError:
+    IntervalTree = None
 
 DEBUG = False
 
@@ -133,7 +143,147 @@ def parse_seed_ranges(line: str) -> IntervalTree:
     
     return t
 
+class PiecewiseMap:
+    # Piecewise-linear map over non-negative ints:
+    #   x in [breakpoints[i], breakpoints[i + 1]) maps to x + offsets[i],
+    #   the last piece extends to infinity.
+    breakpoints: list[int]
+    offsets: list[int]
+    
+    def __init__(self, breakpoints: list[int], offsets: list[int]) -> None:
+        self.breakpoints = []
+        self.offsets = []
+        
+        # Merge neighbours with the same offset
+        for b, o in zip(breakpoints, offsets):
+            if self.offsets and self.offsets[-1] == o:
+                continue
+            self.breakpoints.append(b)
+            self.offsets.append(o)
+    
+    @staticmethod
+    def parse(name: str, lines: list[str]) -> PiecewiseMap:
+        # Collect (src start, src end, offset) entries of the named map
+        entries: list[tuple[int, int, int]] = []
+        append: bool = False
+        
+        for line in lines:
+            # start collecting
+            if name in line:
+                append = True
+                continue
+            # skip
+            if not append:
+                continue
+            # stop collecting
+            if line.strip() == "":
+                break
+            # parse an entry
+            dst, src, length = map(lambda x: int(x), line.split())
+            entries.append((src, src + length, dst - src))
+        
+        # Sorted pieces, gaps are identity
+        breakpoints: list[int] = [0]
+        offsets: list[int] = [0]
+        for start, end, offset in sorted(entries):
+            if start > breakpoints[-1]:
+                breakpoints.append(start)
+                offsets.append(0)
+            if start == breakpoints[-1]:
+                offsets[-1] = offset
+            else:
+                breakpoints.append(start)
+                offsets.append(offset)
+            breakpoints.append(end)
+            offsets.append(0)
+        
+        return PiecewiseMap(breakpoints, offsets)
+    
+    def piece_end(self, i: int) -> float:
+        return self.breakpoints[i + 1] if i + 1 < len(self.breakpoints) else math.inf
+    
+    def __call__(self, x: int) -> int:
+        return x + self.offsets[bisect_right(self.breakpoints, x) - 1]
+    
+    def then(self, other: PiecewiseMap) -> PiecewiseMap:
+        # Composition: 'other' applied after 'self'
+        breakpoints: list[int] = []
+        offsets: list[int] = []
+        
+        for i, (start, offset) in enumerate(zip(self.breakpoints, self.offsets)):
+            # Split the image of the piece at the breakpoints of 'other'
+            image_end = self.piece_end(i) + offset
+            a = start + offset
+            j = bisect_right(other.breakpoints, a) - 1
+            
+            while a < image_end:
+                breakpoints.append(a - offset)
+                offsets.append(offset + other.offsets[j])
+                j += 1
+                if j >= len(other.breakpoints):
+                    break
+                a = other.breakpoints[j]
+        
+        return PiecewiseMap(breakpoints, offsets)
+    
+    def map_range(self, start: int, end: int) -> list[tuple[int, int]]:
+        # Image of [start, end) as a list of [start, end) ranges
+        res: list[tuple[int, int]] = []
+        i = bisect_right(self.breakpoints, start) - 1
+        
+        while start < end:
+            piece_end = min(self.piece_end(i), end)
+            res.append((start + self.offsets[i], int(piece_end) + self.offsets[i]))
+            start = int(piece_end)
+            i += 1
+        
+        return res
+
+MAP_NAMES = [
+    "seed-to-soil", "soil-to-fertilizer", "fertilizer-to-water", "water-to-light",
+    "light-to-temperature", "temperature-to-humidity", "humidity-to-location",
+]
+
+def compile_almanac(lines: list[str]) -> PiecewiseMap:
+    return reduce(lambda acc, m: acc.then(m), [PiecewiseMap.parse(name, lines) for name in MAP_NAMES])
+
 def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--interval-tree", action="store_true",
+                        help="evaluate with the original interval tree mappings (cross-check)")
+    args = parser.parse_args()
+    
+    if args.interval_tree:
+        main_interval_tree()
+        return
+    
+    lines = open("input.txt", "r").readlines()
+    
+    # prepare data
+    seed_to_location = compile_almanac(lines)
+    nums = [*map(lambda x: int(x), lines[0].split(":")[1].split())]
+    
+    # ex. 1
+    print("# Ex. 1")
+    print(min(map(seed_to_location, nums)))
+    
+    # ex. 2
+    print("# Ex. 2")
+    if len(nums) % 2:
+        raise Exception("Invalid input: not even!")
+    
+    # find the min location
+    min_location = min(
+        start
+        for a, b in zip(nums[::2], nums[1::2])
+        for start, _ in seed_to_location.map_range(a, a + b)
+    )
+    print(min_location)
+
+def main_interval_tree() -> None:
+    if IntervalTree is None:
+        raise Exception("The intervaltree package is required for --interval-tree")
+    
     lines = open("input.txt", "r").readlines()
     
     # prepare data
@@ -1,8 +1,14 @@
+import argparse
+import numpy as np
+
 class Hand:
     cards: str
     points: int
     with_joker_rule: bool
     
+    # Packed sort keys: (without, with joker rule)
+    keys: tuple[int, int]
+    
     card_values = {'A': 14, 'K': 13, 'Q': 12, 'J': 11, 'T': 10}
     
     def __init__(self, line: str, with_joker: bool = False) -> None:
@@ -11,18 +17,42 @@ class Hand:
         self.cards = cards
         self.points = int(points)
         self.with_joker_rule = with_joker
+        
+        self.keys = (self.pack_key(False), self.pack_key(True))
 
     def __repr__(self) -> str:
         return f"{self.cards} | {self.points}"
     
-    def get_counts(self) -> list[int]:
+    @property
+    def sort_key(self) -> int:
+        return self.keys[self.with_joker_rule]
+    
+    def pack_key(self, with_joker: bool) -> int:
+        # Type, then the cards in order, 4 bits each
+        key = self.type(with_joker)
+        for c in self.cards:
+            key = (key << 4) | Hand.card_value(c, with_joker)
+        return key
+    
+    @staticmethod
+    def card_value(c: str, with_joker: bool) -> int:
+        if with_joker and c == "J":
+            return 1    # loses with everything
+        if c in Hand.card_values:
+            return Hand.card_values[c]
+        return int(c)
+    
+    def get_counts(self, with_joker: bool | None = None) -> list[int]:
+        if with_joker is None:
+            with_joker = self.with_joker_rule
+        
         card_dict: dict[str, int] = {}
         for c in self.cards:
             if not c in card_dict.keys():
                 card_dict[c] = 0
             card_dict[c] += 1
         
-        if self.with_joker_rule and 'J' in card_dict.keys():
+        if with_joker and 'J' in card_dict.keys():
             # grab and zero out jokers
             jokers = card_dict['J']
             card_dict['J'] = 0
@@ -36,8 +66,8 @@ class Hand:
         # without joker rule
         return sorted(card_dict.values(), reverse=True)
     
-    def type(self) -> int:
-        match self.get_counts():
+    def type(self, with_joker: bool | None = None) -> int:
+        match self.get_counts(with_joker):
             case [a, *_] if a == 5:
                 return 6
             case [a, b, *_] if a == 4 and b == 1:
@@ -55,51 +85,13 @@ class Hand:
         raise Exception("Something went wrong")
     
     def beats(self, c1: str, c2: str) -> bool:
-        if self.with_joker_rule:
-            # loses with everything
-            if c1 == "J":
-                return False
-            if c2 == "J":
-                return True
-        
-        if c1 in Hand.card_values:
-            val1 = Hand.card_values[c1]
-        else:
-            val1 = int(c1)
-        
-        if c2 in Hand.card_values:
-            val2 = Hand.card_values[c2]
-        else:
-            val2 = int(c2)
-        
-        return val1 > val2
+        return Hand.card_value(c1, self.with_joker_rule) > Hand.card_value(c2, self.with_joker_rule)
     
     def __lt__(self, other) -> bool:
-        s_type = self.type()
-        o_type = other.type()
-        
-        if s_type < o_type:
-            return True
-        elif s_type > o_type:
-            return False
-        else:
-            def f(s_cards: list[str], o_cards: list[str]) -> bool:
-                match s_cards, o_cards:
-                    case [s, *s_rest], [o, *o_rest]:
-                        if self.beats(o, s):
-                            return True
-                        elif self.beats(s, o):
-                            return False
-                        else:
-                            return f(s_rest, o_rest)
-                    case [], []:
-                        raise Exception("Equal hands")
-                raise Exception("Invalid input")
-            
-            return f(list(self.cards), list(other.cards))
+        return self.sort_key < other.sort_key
 
 def get_sum_of_points(hands: list[Hand]) -> int:
-    ranked = sorted(hands) # from worst to best
+    ranked = sorted(hands, key=lambda hand: hand.sort_key) # from worst to best
     
     sum = 0
     i = 1
@@ -109,9 +101,137 @@ def get_sum_of_points(hands: list[Hand]) -> int:
     
     return sum
 
+# Columnar path: all hands as NumPy arrays
+class HandTable:
+    ranks: np.ndarray   # n x 5, uint8 card values (J = 11)
+    bids: np.ndarray    # n, int64
+    
+    # byte -> card value, 'J' is remapped for the joker rule
+    RANK_LOOKUP = np.zeros(256, dtype=np.uint8)
+    RANK_LOOKUP[np.frombuffer(b"23456789TJQKA", dtype=np.uint8)] = [
+        Hand.card_value(c, False) for c in "23456789TJQKA"
+    ]
+    
+    # (jokers, sum of squared group sizes) -> hand type.
+    #   Jokers form one group of their own in the squares; for 5 cards the
+    #   other groups are still uniquely determined, jokers then join the largest
+    TYPE_TABLE = np.zeros((6, 26), dtype=np.uint32)
+    TYPE_TABLE[0, [5, 7, 9, 11, 13, 17, 25]] = [0, 1, 2, 3, 4, 5, 6]
+    TYPE_TABLE[1, [5, 7, 9, 11, 17]] = [1, 3, 4, 5, 6]
+    TYPE_TABLE[2, [7, 9, 13]] = [3, 5, 6]
+    TYPE_TABLE[3, [11, 13]] = [5, 6]
+    TYPE_TABLE[4, 17] = 6
+    TYPE_TABLE[5, 25] = 6
+    
+    def __init__(self, lines: list[str] | None = None) -> None:
+        if lines is None:
+            # Empty HandTable object created
+            self.ranks = np.zeros((0, 5), dtype=np.uint8)
+            self.bids = np.zeros(0, dtype=np.int64)
+            return
+        self.parse(np.frombuffer("\n".join(line.strip() for line in lines).encode(), dtype=np.uint8))
+    
+    @classmethod
+    def from_file(cls, path: str) -> "HandTable":
+        with open(path, "rb") as f:
+            data = np.frombuffer(f.read(), dtype=np.uint8)
+        res = cls()
+        res.parse(data)
+        return res
+    
+    def parse(self, data: np.ndarray) -> None:
+        # Vectorized parser over the raw bytes: "CCCCC bid" per line
+        newlines = np.flatnonzero(data == ord("\n"))
+        starts = np.concatenate(([0], newlines + 1))
+        ends = np.concatenate((newlines, [len(data)]))
+        
+        # Drop "\r" of CRLF input and blank lines
+        if (data == ord("\r")).any():
+            ends -= (ends > starts) & (data[np.maximum(ends - 1, 0)] == ord("\r"))
+        if (ends == starts).any():
+            keep = ends > starts
+            starts, ends = starts[keep], ends[keep]
+        
+        if (ends - starts < 7).any() or (data[starts + 5] != ord(" ")).any():
+            raise Exception("Malformed hand line")
+        
+        # Cards, one column at a time (column-major, so columns are contiguous)
+        self.ranks = np.empty((len(starts), 5), dtype=np.uint8, order="F")
+        for k in range(5):
+            self.ranks[:, k] = self.RANK_LOOKUP[data[starts + k]]
+        if (self.ranks == 0).any():
+            raise Exception("Invalid card")
+        
+        # Bids, one digit column at a time
+        self.bids = np.zeros(len(starts), dtype=np.int64)
+        for k in range(int((ends - starts).max(initial=6)) - 6):
+            pos = starts + 6 + k
+            in_bid = pos < ends
+            digits = data[np.minimum(pos, len(data) - 1)] - np.uint8(ord("0"))
+            if (in_bid & (digits > 9)).any():
+                raise Exception("Invalid bid")
+            np.multiply(self.bids, 10, out=self.bids, where=in_bid)
+            np.add(self.bids, digits, out=self.bids, where=in_bid)
+    
+    def get_ranks(self, with_joker: bool) -> np.ndarray:
+        if not with_joker:
+            return self.ranks
+        return np.where(self.ranks == Hand.card_values['J'], np.uint8(1), self.ranks)
+    
+    def types(self, with_joker: bool) -> np.ndarray:
+        ranks = self.get_ranks(with_joker)
+        n = len(ranks)
+        
+        # Sum of squared group sizes: 5 + 2 * equal pairs
+        pairs = np.zeros(n, dtype=np.uint8)
+        for i in range(5):
+            for j in range(i + 1, 5):
+                pairs += ranks[:, i] == ranks[:, j]
+        squares = pairs * np.uint8(2) + np.uint8(5)
+        
+        jokers = np.zeros(n, dtype=np.uint8)
+        if with_joker:
+            for i in range(5):
+                jokers += ranks[:, i] == 1
+        
+        return self.TYPE_TABLE[jokers, squares]
+    
+    def keys(self, with_joker: bool) -> np.ndarray:
+        # Same packing as Hand.pack_key
+        key = self.types(with_joker)
+        ranks = self.get_ranks(with_joker)
+        for i in range(5):
+            key <<= 4
+            key |= ranks[:, i]
+        return key
+    
+    @staticmethod
+    def stable_order(keys: np.ndarray) -> np.ndarray:
+        # LSD radix argsort in two 16-bit passes (keys fit in 32 bits),
+        #   NumPy's stable sort is a radix sort for 16-bit integers
+        order = np.argsort((keys & 0xFFFF).astype(np.uint16), kind="stable")
+        high = (keys >> 16).astype(np.uint16)[order]
+        return order[np.argsort(high, kind="stable")]
+    
+    def get_sum_of_points(self, with_joker: bool = False) -> int:
+        order = self.stable_order(self.keys(with_joker)) # from worst to best
+        return int(self.bids[order] @ np.arange(1, len(order) + 1, dtype=np.int64))
+
 def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--columnar", action="store_true", help="rank with the NumPy hand table")
+    args = parser.parse_args()
+    
     lines = open("input.txt", "r").readlines()
     
+    if args.columnar:
+        table = HandTable.from_file("input.txt")
+        print("Ex. 1")
+        print(table.get_sum_of_points())
+        print("Ex. 2")
+        print(table.get_sum_of_points(with_joker=True))
+        return
+    
     # Ex. 1
     print("Ex. 1")
     hands: list[Hand] = []
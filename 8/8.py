@@ -1,5 +1,9 @@
+from __future__ import annotations
 import math
-from itertools import cycle
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import Tuple
 
 class BinaryNode:
     val: str
@@ -16,17 +20,11 @@ class BinaryNode:
             rhs.split(",")
         )
         
-    def try_link(self, nodes) -> None:
-        linked = 0
-        for node in nodes:
-            if node.val == self.right:
-                self.right_link = node
-                linked += 1
-            if node.val == self.left:
-                self.left_link = node
-                linked += 1
-        if linked != 2:
+    def try_link(self, nodes_by_val: dict[str, BinaryNode]) -> None:
+        if self.left not in nodes_by_val or self.right not in nodes_by_val:
             raise Exception("Node not found")
+        self.left_link = nodes_by_val[self.left]
+        self.right_link = nodes_by_val[self.right]
 
     @property
     def is_ghost_start(self) -> bool:
@@ -42,87 +40,253 @@ class BinaryNode:
 class BinaryGraph:
     nodes: list[BinaryNode]
     
+    # Node names interned to ids (index in 'nodes')
+    ids: dict[str, int]
+    left: array
+    right: array
+    
+    # Binary lifting: per instruction string, node after 2^k full passes
+    jumps: dict[bytes, list[array]]
+    
     def __init__(self, lines: list[str]) -> None:
         self.nodes = []
+        self.jumps = {}
         
         # Parse
         for line in lines:
+            if not line.strip():
+                continue
             node = BinaryNode(line)
             self.nodes.append(node)
         
+        # Intern
+        self.ids = {node.val: i for i, node in enumerate(self.nodes)}
+        
         # Link
+        nodes_by_val = {node.val: node for node in self.nodes}
         for node in self.nodes:
-            node.try_link(self.nodes)
+            node.try_link(nodes_by_val)
+        
+        self.left = array("i", (self.ids[node.left] for node in self.nodes))
+        self.right = array("i", (self.ids[node.right] for node in self.nodes))
             
     def get(self, val: str) -> BinaryNode:
-        for node in self.nodes:
-            if node.val == val:
-                return node
-        raise Exception("Node not found")
+        if val not in self.ids:
+            raise Exception("Node not found")
+        return self.nodes[self.ids[val]]
     
     @property
     def hd(self) -> BinaryNode:
-        for node in self.nodes:
-            if node.val == "AAA":
-                return node
-        raise Exception("Start node not found")
+        if "AAA" not in self.ids:
+            raise Exception("Start node not found")
+        return self.nodes[self.ids["AAA"]]
+    
+    @staticmethod
+    def encode_steps(steps: str) -> bytes:
+        # 'L' -> 0, 'R' -> 1
+        if steps.strip("LR"):
+            raise Exception("Invalid step")
+        return steps.translate({ord("L"): 0, ord("R"): 1}).encode()
+    
+    def get_jumps(self, code: bytes, passes: int) -> list[array]:
+        # Extend the lifting table until it covers 'passes'
+        if code not in self.jumps:
+            pass_table = PassTable(self.left, self.right, code, bytes(len(self.nodes)))
+            self.jumps[code] = [array("i", (pass_table.get(i)[0] for i in range(len(self.nodes))))]
+        jumps = self.jumps[code]
+        
+        while (1 << len(jumps)) <= passes:
+            last = jumps[-1]
+            jumps.append(array("i", (last[i] for i in last)))
+        return jumps
+    
+    def position_after(self, start_val: str, count: int, steps: str) -> BinaryNode:
+        # Node reached after 'count' steps: whole passes in O(log), then the rest
+        code = self.encode_steps(steps)
+        tables = (self.left, self.right)
+        passes, rest = divmod(count, len(code))
+        
+        ptr = self.ids[start_val]
+        for k, jump in enumerate(self.get_jumps(code, passes)):
+            if passes >> k & 1:
+                ptr = jump[ptr]
+        
+        for c in code[:rest]:
+            ptr = tables[c][ptr]
+        
+        return self.nodes[ptr]
     
     def count_steps_to(self, dest_val: str, steps: str) -> int:
-        ptr = self.hd
+        code = self.encode_steps(steps)
+        tables = (self.left, self.right)
+        
+        ptr = self.ids[self.hd.val]
+        dest = self.ids[dest_val]
         count = 0
         
-        for step in cycle(steps):
-            # End condition
-            if ptr.val == dest_val:
-                return count
-            
+        while ptr != dest:
             # Follow links
-            if step == 'L':
-                ptr = ptr.left_link
-            elif step == 'R':
-                ptr = ptr.right_link
-            else:
-                raise Exception("Invalid step")
-            
-            # Increment count
+            ptr = tables[code[count % len(code)]][ptr]
             count += 1
             
-        raise Exception("Unreachable code")
+        return count
     
-    def count_ghost_steps(self, steps: str) -> int:
+    def count_ghost_steps(self, steps: str, workers: int = 1) -> int:
+        code = self.encode_steps(steps)
+        is_end = bytes(node.is_ghost_end for node in self.nodes)
+        pass_table = PassTable(self.left, self.right, code, is_end)
+        
         # Assemble starting points
-        ptrs: list[BinaryNode] = []
-        for node in self.nodes:
-            if node.is_ghost_start:
-                ptrs.append(node)
-                
-        # Go
-        needed_steps: list[int] = []
-        count = 0
-        for step in cycle(steps):
-            for ptr in ptrs:
-                if ptr.is_ghost_end:
-                    # Append
-                    needed_steps.append(count)
-                    # Remove ptr (found)
-                    ptrs.remove(ptr)
-            
-            if len(ptrs) == 0:
-                # The result is their lowest common multiple
-                return math.lcm(*needed_steps)
-            
-            for i in range(0, len(ptrs)):
-                if step == 'L':
-                    ptrs[i] = ptrs[i].left_link
-                elif step == 'R':
-                    ptrs[i] = ptrs[i].right_link
-                else:
-                    raise Exception("Invalid step")
-            
-            # Increment count
-            count += 1
-            
-        raise Exception("Unreachable code")
+        starts = [i for i, node in enumerate(self.nodes) if node.is_ghost_start]
+        
+        # Analyze every ghost
+        if workers <= 1:
+            ghosts = [analyze_ghost(pass_table, start) for start in starts]
+        else:
+            # Tables are sent once per worker, not once per ghost
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(pass_table,)) as executor:
+                ghosts = list(executor.map(_analyze_in_worker, starts))
+        
+        return first_common_hit(ghosts)
+
+
+class PassTable:
+    # Per node, memoized on first use: the node after one full pass of the
+    #   instructions, and the offsets within that pass at which a target is hit
+    left: array
+    right: array
+    code: bytes
+    targets: bytes
+    passes: dict[int, Tuple[int, list[int]]]
+    
+    def __init__(self, left: array, right: array, code: bytes, targets: bytes) -> None:
+        self.left = left
+        self.right = right
+        self.code = code
+        self.targets = targets
+        self.passes = {}
+    
+    def get(self, node: int) -> Tuple[int, list[int]]:
+        if node in self.passes:
+            return self.passes[node]
+        
+        tables = (self.left, self.right)
+        hits: list[int] = []
+        ptr = node
+        for offset, c in enumerate(self.code):
+            if self.targets[ptr]:
+                hits.append(offset)
+            ptr = tables[c][ptr]
+        
+        self.passes[node] = (ptr, hits)
+        return self.passes[node]
+
+
+class GhostCycle:
+    # Walk of one ghost: the (node, instruction index) states repeat
+    #   after 'tail' steps with the given 'period' (both whole passes).
+    # Hits are step counts at which the ghost stands on a Z node.
+    tail: int
+    period: int
+    tail_hits: list[int]    # hits < tail
+    cycle_hits: list[int]   # hits in [tail, tail + period), repeating
+    
+    # For O(1) hits_at
+    tail_hit_set: set[int]
+    cycle_residues: set[int]
+    
+    def __init__(self, tail: int, period: int, tail_hits: list[int], cycle_hits: list[int]) -> None:
+        self.tail = tail
+        self.period = period
+        self.tail_hits = tail_hits
+        self.cycle_hits = cycle_hits
+        
+        self.tail_hit_set = set(tail_hits)
+        self.cycle_residues = {h % period for h in cycle_hits}
+    
+    def hits_at(self, count: int) -> bool:
+        if count < self.tail:
+            return count in self.tail_hit_set
+        return count % self.period in self.cycle_residues
+    
+    def __repr__(self) -> str:
+        return f"<tail: {self.tail}, period: {self.period}, hits: {self.tail_hits} {self.cycle_hits}>"
+
+
+# Per-process state of the ghost analysis workers
+_worker_pass_table: PassTable | None = None
+
+
+def _init_worker(pass_table: PassTable) -> None:
+    global _worker_pass_table
+    _worker_pass_table = pass_table
+
+
+def _analyze_in_worker(start: int) -> GhostCycle:
+    if _worker_pass_table is None:
+        raise Exception("Worker not initialized")
+    return analyze_ghost(_worker_pass_table, start)
+
+
+def analyze_ghost(pass_table: PassTable, start: int) -> GhostCycle:
+    # Walk whole passes until the node at the start of a pass repeats
+    length = len(pass_table.code)
+    first_seen: dict[int, int] = {}
+    hits: list[int] = []
+    
+    ptr = start
+    passes = 0
+    while ptr not in first_seen:
+        first_seen[ptr] = passes
+        ptr, pass_hits = pass_table.get(ptr)
+        hits += [passes * length + offset for offset in pass_hits]
+        passes += 1
+    
+    tail = first_seen[ptr] * length
+    return GhostCycle(tail, passes * length - tail, [h for h in hits if h < tail], [h for h in hits if h >= tail])
+
+
+def crt(a1: int, m1: int, a2: int, m2: int) -> tuple[int, int] | None:
+    # Solve x = a1 (mod m1), x = a2 (mod m2), moduli need not be coprime
+    g = math.gcd(m1, m2)
+    if (a2 - a1) % g:
+        return None
+    k = (a2 - a1) // g * pow(m1 // g, -1, m2 // g) % (m2 // g)
+    lcm = m1 // g * m2
+    return ((a1 + m1 * k) % lcm, lcm)
+
+
+def first_common_hit(ghosts: list[GhostCycle]) -> int:
+    # Before every ghost is in its cycle: only the hits of the ghost
+    #   with the longest tail can be answers there
+    reference = max(ghosts, key=lambda ghost: ghost.tail)
+    longest_tail = reference.tail
+    for count in reference.tail_hits:
+        if all(ghost.hits_at(count) for ghost in ghosts):
+            return count
+    
+    # Afterwards: one residue per ghost, combined with the CRT
+    best: int | None = None
+    for hits in product(*[ghost.cycle_hits for ghost in ghosts]):
+        res: tuple[int, int] | None = (0, 1)
+        for h, ghost in zip(hits, ghosts):
+            if res is None:
+                break
+            res = crt(res[0], res[1], h % ghost.period, ghost.period)
+        if res is None:
+            continue
+        
+        # Smallest solution not before the longest tail
+        x, m = res
+        if x < longest_tail:
+            x += (longest_tail - x + m - 1) // m * m
+        if best is None or x < best:
+            best = x
+    
+    if best is None:
+        raise Exception("Ghosts never meet")
+    return best
 
 def main() -> None:
     lines = open("input.txt", "r").readlines()